@@ -2,8 +2,9 @@
 NutriScan AI - Streamlit Application
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from PIL import Image
-import os
+from concurrent.futures import ThreadPoolExecutor
 import model1
 import model2
 import model3
@@ -13,7 +14,7 @@ st.set_page_config(page_title="NutriScan AI", layout="wide")
 @st.cache_resource
 def load_model4_db():
     """
-    Loads the alternatives CSV file into a pandas DataFrame.
+    Loads the alternatives CSV file into a product -> alternative lookup dict.
     """
     print("--- Loading Model 4 Alternatives Database ---")
     return model4.load_alternatives("data\product_alternatives.csv")
@@ -37,9 +38,96 @@ def load_model2_data():
     return model2.load_data()
 
 # --- Load all data on startup ---
-alternatives_db = load_model4_db()
-model1_model, model1_data, model1_labels = load_model1_data()
-model2_safety_df, model2_nutrition_df, model2_ingredients_list = load_model2_data()
+# The three loaders are independent, so run them concurrently; each stays
+# cached, so later reruns return immediately.
+with ThreadPoolExecutor(max_workers=3, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx())) as executor:
+    model4_future = executor.submit(load_model4_db)
+    model1_future = executor.submit(load_model1_data)
+    model2_future = executor.submit(load_model2_data)
+    alternatives_db = model4_future.result()
+    model1_model, model1_data, model1_labels = model1_future.result()
+    model2_safety_df, model2_nutrition_df, model2_ingredients_list, model2_lookups = model2_future.result()
+
+@st.cache_data(show_spinner=False)
+def analyze_product_cached(product_id, _product_info):
+    """
+    Runs Model 2 for a product, cached on its product_id.
+    (The leading underscore stops Streamlit from hashing the product dict.)
+    """
+    return model2.analyze_product(
+        _product_info, 
+        model2_ingredients_list,
+        model2_lookups
+    )
+
+@st.cache_data(show_spinner=False)
+def identify_product_cached(image_bytes):
+    """
+    Runs Model 1 on the uploaded image bytes, cached on the bytes so
+    re-uploading the same image or rerunning the script skips inference.
+    """
+    return model1.get_product_info_from_image(
+        image_bytes, 
+        model1_model, 
+        model1_data, 
+        model1_labels
+    )
+
+def run_pipeline(image_bytes: bytes) -> dict:
+    """
+    Runs Models 1-4 on the uploaded image bytes. The expensive stages
+    (Models 1 and 2) are cached individually and raise on failure, so only
+    successful runs are cached; errors are collected per model for display.
+    """
+    result = {
+        "product_info": None,
+        "analysis_result": None,
+        "safety_score": None,
+        "alternative": None,
+        "errors": {}
+    }
+
+    # ---------------- MODEL 1 ----------------
+    try:
+        product_info = identify_product_cached(image_bytes)
+    except Exception as e:
+        result["errors"]["model1"] = str(e)
+        return result
+    if not product_info or "error" in product_info:
+        return result
+    result["product_info"] = product_info
+
+    # ---------------- MODEL 2 ----------------
+    try:
+        analysis_result = analyze_product_cached(product_info['product_id'], product_info)
+    except Exception as e:
+        result["errors"]["model2"] = str(e)
+        return result
+    result["analysis_result"] = analysis_result
+
+    # ---------------- MODEL 3 ----------------
+    try:
+        safety_score = model3.compute_safety_score_from_model2_output(
+            analysis_result,
+            weight_ingredient=0.7, 
+            weight_nutrition=0.3
+        )
+    except Exception as e:
+        result["errors"]["model3"] = str(e)
+        return result
+    result["safety_score"] = safety_score
+
+    # ---------------- MODEL 4 ----------------
+    try:
+        result["alternative"] = model4.suggest_alternative(
+            product_name=product_info['product_name'],
+            safety_score=safety_score,
+            alternatives_map=alternatives_db
+        )
+    except Exception as e:
+        result["errors"]["model4"] = str(e)
+
+    return result
 
 st.title("NutriScan AI: Your Personal Food Scanner")
 st.write("Upload an image of a food product to get a detailed analysis of its ingredients, nutritional value, and a safety score.")
@@ -57,42 +145,27 @@ if uploaded_file is not None:
     with col2:
         st.write("Analyzing... please wait.")
 
-        # Save temp file for model1 to process
-        temp_image_path = "temp_image.jpg"
-        with open(temp_image_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-
-        product_info = None
-        analysis_result = None
-        safety_score = None
+        pipeline = run_pipeline(uploaded_file.getvalue())
+        errors = pipeline["errors"]
+        product_info = pipeline["product_info"]
+        analysis_result = pipeline["analysis_result"]
+        safety_score = pipeline["safety_score"]
 
         # ---------------- MODEL 1 ----------------
         with st.expander("Step 1: Product Identification", expanded=True):
-            try:
-                product_info = model1.get_product_info_from_image(
-                    temp_image_path, 
-                    model1_model, 
-                    model1_data, 
-                    model1_labels
-                )
-                if product_info:
-                    st.success(f"**Product Identified:** {product_info['product_name']} (Confidence: {product_info['prediction_confidence']:.2%})")
-                else:
-                    st.error("Could not identify the product or find it in our database.")
-            except Exception as e:
-                st.error(f"An error occurred in Model 1: {e}")
-                product_info = None
+            if "model1" in errors:
+                st.error(f"An error occurred in Model 1: {errors['model1']}")
+            elif product_info:
+                st.success(f"**Product Identified:** {product_info['product_name']} (Confidence: {product_info['prediction_confidence']:.2%})")
+            else:
+                st.error("Could not identify the product or find it in our database.")
 
         # ---------------- MODEL 2 ----------------
         if product_info:
             with st.expander("Step 2: Ingredient and Nutrition Analysis", expanded=True):
-                try:
-                    analysis_result = model2.analyze_product(
-                        product_info, 
-                        model2_safety_df, 
-                        model2_nutrition_df, 
-                        model2_ingredients_list
-                    )
+                if "model2" in errors:
+                    st.error(f"An error occurred in Model 2: {errors['model2']}")
+                else:
                     st.subheader("Ingredient Analysis")
                     for ing in analysis_result['ingredient_analysis']:
                         icon = "🟢" if ing['status'] == 'safe' else "🟡" if ing['status'] == 'caution' else "🔴" if ing['status'] == 'unsafe' else "⚪"
@@ -113,20 +186,12 @@ if uploaded_file is not None:
                     else:
                         st.markdown("_No specific cons identified._")
 
-                except Exception as e:
-                    st.error(f"An error occurred in Model 2: {e}")
-                    analysis_result = None
-
         # ---------------- MODEL 3 ----------------
         if analysis_result:
             with st.expander("Step 3: Overall Safety Score", expanded=True):
-                try:
-                    safety_score = model3.compute_safety_score_from_model2_output(
-                        analysis_result,
-                        weight_ingredient=0.7, 
-                        weight_nutrition=0.3
-                    )
-
+                if "model3" in errors:
+                    st.error(f"An error occurred in Model 3: {errors['model3']}")
+                else:
                     st.metric(label="Overall Product Safety Score", value=f"{safety_score}/10")
                     
                     if safety_score < 4.0:
@@ -136,31 +201,18 @@ if uploaded_file is not None:
                     else:
                         st.success("This product is rated 'Safe'.")
 
-                except Exception as e:
-                    st.error(f"An error occurred in Model 3: {e}")
-                    safety_score = None
-
         # ---------------- MODEL 4 ----------------
         if product_info and safety_score is not None:
             with st.expander("Step 4: Healthier Alternatives", expanded=True):
-                try:
-                    alternative_string = model4.suggest_alternative(
-                        product_name=product_info['product_name'],
-                        safety_score=safety_score,
-                        alternatives_df=alternatives_db
-                    )
-
-                    if alternative_string:
-                        st.write("Here is a healthier alternative you might consider:")
-                        st.success(f"**Suggestion:** {alternative_string}")
+                alternative_string = pipeline["alternative"]
+
+                if "model4" in errors:
+                    st.error(f"An error occurred in Model 4: {errors['model4']}")
+                elif alternative_string:
+                    st.write("Here is a healthier alternative you might consider:")
+                    st.success(f"**Suggestion:** {alternative_string}")
+                else:
+                    if safety_score >= model4.SAFETY_THRESHOLD:
+                        st.info("This product is rated 'Safe', so no alternative is suggested.")
                     else:
-                        if safety_score >= 7.0:
-                            st.info("This product is rated 'Safe', so no alternative is suggested.")
-                        else:
-                            st.info(f"This product is rated 'Moderate' or 'Unsafe', but no simple alternative was found for '{product_info['product_name']}' in our database.")
-                
-                except Exception as e:
-                    st.error(f"An error occurred in Model 4: {e}")
-
-        if os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
\ No newline at end of file
+                        st.info(f"This product is rated 'Moderate' or 'Unsafe', but no simple alternative was found for '{product_info['product_name']}' in our database.")
\ No newline at end of file
@@ -1,21 +1,27 @@
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import load_img, img_to_array
 from tensorflow.keras.applications import MobileNetV2 
 from tensorflow.keras import layers, models        
 import numpy as np
 import pandas as pd
 import json
+import glob
 import os
+import threading
 
 WEIGHTS_PATH = "data/product_classifier.weights.h5" 
+KERAS_MODEL_PATH = "data/product_classifier.keras"
+TFLITE_PATH = "data/product_classifier_int8.tflite"
 DATA_PATH = "data/product_ingredients.xlsx"
+PARQUET_DATA_PATH = "data/product_ingredients.parquet"
 LABELS_PATH = "data/class_labels.json"
 IMG_SIZE = (224, 224)
 NUM_CLASSES = 10
+CALIBRATION_DIR = "image"
+NUM_CALIBRATION_IMAGES = 50
 
-def create_model_architecture(num_classes):
+def create_model_architecture(num_classes, base_weights='imagenet'):
     """Defines the MobileNetV2-based model structure."""
-    base_model = MobileNetV2(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
+    base_model = MobileNetV2(weights=base_weights, include_top=False, input_shape=(224, 224, 3))
     base_model.trainable = False  
 
     model = models.Sequential([
@@ -28,18 +34,101 @@ def create_model_architecture(num_classes):
     
     return model
 
+def save_keras_model(output_path=KERAS_MODEL_PATH):
+    """One-time migration: builds the model, loads the trained weights and saves the full model."""
+    # The trained weights restore every layer, so skip the ImageNet download.
+    model = create_model_architecture(NUM_CLASSES, base_weights=None)
+    model.load_weights(WEIGHTS_PATH)
+    model.save(output_path)
+    print(f"Saved Keras model to {output_path}")
+    return model
+
+def load_keras_model():
+    """Loads the saved Keras model without rebuilding MobileNetV2 or its optimizer."""
+    if not os.path.exists(KERAS_MODEL_PATH):
+        return save_keras_model()
+    return tf.keras.models.load_model(KERAS_MODEL_PATH, compile=False)
+
+def with_uint8_input(model):
+    """Wraps a trained model so it takes raw uint8 pixels and rescales them to [0, 1] itself."""
+    inputs = layers.Input(shape=(*IMG_SIZE, 3), dtype="uint8")
+    x = layers.Rescaling(1.0 / 255)(inputs)
+    outputs = model(x)
+    return models.Model(inputs, outputs)
+
+@tf.function(input_signature=[tf.TensorSpec(shape=[], dtype=tf.string)])
+def decode_image(contents):
+    """Decodes and resizes encoded image bytes into a (224, 224, 3) uint8 tensor."""
+    img = tf.cond(
+        tf.io.is_jpeg(contents),
+        lambda: tf.io.decode_jpeg(contents, channels=3, dct_method="INTEGER_FAST"),
+        lambda: tf.io.decode_image(contents, channels=3, expand_animations=False)
+    )
+    return tf.image.resize(img, IMG_SIZE, method="nearest")
+
+def representative_dataset():
+    """Yields preprocessed sample images used to calibrate int8 quantization."""
+    image_paths = sorted(glob.glob(os.path.join(CALIBRATION_DIR, "*.jpg")))[:NUM_CALIBRATION_IMAGES]
+    if not image_paths:
+        raise RuntimeError(f"Error: No calibration images found in {CALIBRATION_DIR}.")
+    for image_path in image_paths:
+        img_array = np.expand_dims(decode_image(tf.io.read_file(image_path)).numpy(), axis=0)
+        yield [img_array]
+
+def export_tflite_model(output_path=TFLITE_PATH):
+    """Converts the trained Keras model into a full-integer TFLite model with a uint8 pixel input."""
+    model = with_uint8_input(load_keras_model())
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_output_type = tf.int8
+    tflite_model = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    print(f"Saved int8 TFLite model to {output_path}")
+
+def export_data_parquet(output_path=PARQUET_DATA_PATH):
+    """One-time conversion of the product workbook to a Parquet file."""
+    pd.read_excel(DATA_PATH).to_parquet(output_path, compression="zstd")
+    print(f"Saved product data to {output_path}")
+
+def load_product_data():
+    """Loads product rows (from Parquet if exported, else the workbook), indexed by product_name."""
+    if os.path.exists(PARQUET_DATA_PATH):
+        data = pd.read_parquet(PARQUET_DATA_PATH, engine="pyarrow", dtype_backend="pyarrow")
+    else:
+        data = pd.read_excel(DATA_PATH)
+    return data.drop_duplicates("product_name").set_index("product_name", drop=False)
+
+def create_interpreter(model_path=TFLITE_PATH):
+    """Creates a TFLite interpreter using all CPU cores."""
+    # The default op resolver applies the XNNPACK delegate with this thread count.
+    return tf.lite.Interpreter(model_path=model_path, num_threads=os.cpu_count())
+
 def load_model_and_data():
-    """Builds model, loads weights, loads data, and loads class labels."""
-    model = create_model_architecture(NUM_CLASSES)
-    
+    """Loads the int8 TFLite interpreter, loads data, and loads class labels."""
+    if not os.path.exists(TFLITE_PATH):
+        raise RuntimeError(f"Error: TFLite model not found at {TFLITE_PATH}. Did you run 'python model1.py' to export it?")
     try:
-        model.load_weights(WEIGHTS_PATH)
-    except FileNotFoundError:
-        raise RuntimeError(f"Error: Weights file not found at {WEIGHTS_PATH}. Did you run the training script and save weights using model.save_weights('product_classifier_weights.h5')?")
+        interpreter = create_interpreter(TFLITE_PATH)
+        interpreter.allocate_tensors()
     except Exception as e:
-        raise RuntimeError(f"Error loading model weights. Original error: {e}")
+        raise RuntimeError(f"Error loading TFLite model. Original error: {e}")
+    if interpreter.get_input_details()[0]["dtype"] != np.uint8:
+        raise RuntimeError(f"Error: {TFLITE_PATH} expects {interpreter.get_input_details()[0]['dtype'].__name__} input, not uint8 pixels. Re-export it with 'python model1.py'.")
+
+    model = {
+        "interpreter": interpreter,
+        "input_details": interpreter.get_input_details()[0],
+        "output_details": interpreter.get_output_details()[0],
+        # The interpreter is shared by every Streamlit session and is not thread-safe.
+        "lock": threading.Lock(),
+    }
         
-    data = pd.read_excel(DATA_PATH)
+    product_cache = load_product_data().to_dict(orient="index")
     
     try:
         with open(LABELS_PATH, 'r') as f:
@@ -48,18 +137,37 @@ def load_model_and_data():
     except FileNotFoundError:
         print(f"Warning: {LABELS_PATH} not found. Using hardcoded labels.")
         class_labels = {
-            "0": "Amul_Butter", "1": "Bingo_Mad_Angles", "2": "Cadbury_Dairy_Milk", "3": "Coca_Cola", "4": "Kurkure_Masala_Munch", "5": "Maggi_Masala_Noodles", "6": "Oreo_Original", "7": "Parle_G", "8": "Top_Ramen_Curry_Noodles", "9": "Yippee_Noodles"
+            0: "Amul_Butter", 1: "Bingo_Mad_Angles", 2: "Cadbury_Dairy_Milk", 3: "Coca_Cola", 4: "Kurkure_Masala_Munch", 5: "Maggi_Masala_Noodles", 6: "Oreo_Original", 7: "Parle_G", 8: "Top_Ramen_Curry_Noodles", 9: "Yippee_Noodles"
         }
 
-    return model, data, class_labels
+    warm_up(model)
 
-def predict_product(image_path, model, class_labels):
-    """Predicts the product class and confidence from an image."""
-    img = load_img(image_path, target_size=IMG_SIZE)
-    img_array = img_to_array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    
-    prediction = model.predict(img_array)
+    return model, product_cache, class_labels
+
+def warm_up(model):
+    """Runs one dummy decode + invoke so tracing and kernel setup happen at load time, not on the first upload."""
+    blank_jpeg = tf.io.encode_jpeg(tf.zeros((*IMG_SIZE, 3), dtype=tf.uint8)).numpy()
+    run_classifier(blank_jpeg, model)
+
+def run_classifier(image_bytes, model):
+    """Decodes encoded image bytes and returns the dequantized class probabilities."""
+    interpreter = model["interpreter"]
+    input_details = model["input_details"]
+    output_details = model["output_details"]
+
+    img_array = np.expand_dims(decode_image(tf.constant(image_bytes)).numpy(), axis=0)
+
+    with model["lock"]:
+        interpreter.set_tensor(input_details["index"], img_array)
+        interpreter.invoke()
+        output = interpreter.get_tensor(output_details["index"])
+
+    out_scale, out_zero_point = output_details["quantization"]
+    return (output.astype(np.float32) - out_zero_point) * out_scale
+
+def predict_product(image_bytes, model, class_labels):
+    """Predicts the product class and confidence from encoded image bytes."""
+    prediction = run_classifier(image_bytes, model)
     class_idx = np.argmax(prediction, axis=1)[0]
     confidence = np.max(prediction)
     
@@ -87,14 +195,13 @@ def format_product_info(row, confidence):
     }
     return product_json
 
-def get_product_info_from_image(image_path, model, data, class_labels):
+def get_product_info_from_image(image_bytes, model, product_cache, class_labels):
     """Main function to predict, lookup, and format product data."""
     
-    product_name, conf = predict_product(image_path, model, class_labels)
-    product_info = data[data["product_name"] == product_name]
+    product_name, conf = predict_product(image_bytes, model, class_labels)
+    row = product_cache.get(product_name)
     
-    if not product_info.empty:
-        row = product_info.iloc[0].to_dict()
+    if row is not None:
         product_json = format_product_info(row, conf)
         return product_json
     else:
@@ -102,4 +209,8 @@ def get_product_info_from_image(image_path, model, data, class_labels):
             "error": "Product not found in database",
             "predicted_name": product_name,
             "confidence": round(float(conf), 4)
-        }
\ No newline at end of file
+        }
+
+if __name__ == "__main__":
+    export_tflite_model()
+    export_data_parquet()
\ No newline at end of file
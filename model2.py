@@ -1,51 +1,162 @@
+import numpy as np
 import pandas as pd
+import os
+import pickle
 import re
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+import model3
 
-def load_data():
-    ingredient_safety_df = pd.read_csv("data/ingredients_safety_merged.csv")
-    nutrition_df = pd.read_csv("data/nutrition_standards.csv")
+SAFETY_CSV_PATH = "data/ingredients_safety_merged.csv"
+NUTRITION_CSV_PATH = "data/nutrition_standards.csv"
+SAFETY_PARQUET_PATH = "data/ingredients_safety.parquet"
+NUTRITION_PARQUET_PATH = "data/nutrition_standards.parquet"
+LOOKUPS_PATH = "data/ingredients.pkl"
+LOOKUPS_VERSION = 2
+
+_NON_ALNUM = re.compile(r"[^a-z0-9\s]")
+_WS = re.compile(r"\s+")
+_NUMBER = re.compile(r"[\d\.]+")
+_ASCII_CLEAN = str.maketrans({
+    chr(c): " " for c in range(128)
+    if not (chr(c).isdigit() or "a" <= chr(c) <= "z" or chr(c).isspace())
+})
+
+def _read_csv_data():
+    ingredient_safety_df = pd.read_csv(SAFETY_CSV_PATH)
+    nutrition_df = pd.read_csv(NUTRITION_CSV_PATH)
     ingredient_safety_df.columns = ingredient_safety_df.columns.str.strip().str.lower()
     nutrition_df.columns = nutrition_df.columns.str.strip().str.lower()
+    ingredient_safety_df['ingredient_name_clean'] = [clean_text(ref) for ref in ingredient_safety_df['ingredient_name']]
+    nutrition_df['low_threshold'] = nutrition_df['low_threshold'].astype(float)
+    nutrition_df['high_threshold'] = nutrition_df['high_threshold'].astype(float)
+    return ingredient_safety_df, nutrition_df
+
+def _build_all_lookups(ingredient_safety_df, nutrition_df) -> dict:
+    lookups = build_lookups(ingredient_safety_df['ingredient_name_clean'].tolist())
+    lookups["safety_map"] = build_safety_map(ingredient_safety_df)
+    lookups["nutrition_thresh"] = build_nutrition_thresholds(nutrition_df)
+    lookups["version"] = LOOKUPS_VERSION
+    return lookups
+
+def _cache_is_fresh() -> bool:
+    cache_paths = [SAFETY_PARQUET_PATH, NUTRITION_PARQUET_PATH, LOOKUPS_PATH]
+    if not all(os.path.exists(path) for path in cache_paths):
+        return False
+    source_mtime = max(os.path.getmtime(SAFETY_CSV_PATH), os.path.getmtime(NUTRITION_CSV_PATH))
+    return min(os.path.getmtime(path) for path in cache_paths) >= source_mtime
+
+def build_cache():
+    """
+    Writes the normalized frames to Parquet and the precomputed lookups to a
+    pickle so load_data() can skip CSV parsing and text cleaning.
+    """
+    ingredient_safety_df, nutrition_df = _read_csv_data()
+    ingredient_safety_df.to_parquet(SAFETY_PARQUET_PATH)
+    nutrition_df.to_parquet(NUTRITION_PARQUET_PATH)
+    with open(LOOKUPS_PATH, "wb") as f:
+        pickle.dump(_build_all_lookups(ingredient_safety_df, nutrition_df), f)
+    print(f"Saved model2 cache to {SAFETY_PARQUET_PATH}, {NUTRITION_PARQUET_PATH} and {LOOKUPS_PATH}")
+
+def load_data():
+    """
+    Returns (ingredient_safety_df, nutrition_df, ingredients_list, lookups).
+    Analysis only needs ingredients_list and lookups; the DataFrames are
+    returned for callers that want to inspect the raw tables.
+    """
+    lookups = None
+    if _cache_is_fresh():
+        with open(LOOKUPS_PATH, "rb") as f:
+            lookups = pickle.load(f)
+    if lookups is not None and lookups.get("version") == LOOKUPS_VERSION:
+        ingredient_safety_df = pd.read_parquet(SAFETY_PARQUET_PATH)
+        nutrition_df = pd.read_parquet(NUTRITION_PARQUET_PATH)
+    else:
+        ingredient_safety_df, nutrition_df = _read_csv_data()
+        lookups = _build_all_lookups(ingredient_safety_df, nutrition_df)
     ingredients_list = ingredient_safety_df['ingredient_name'].tolist()
-    return ingredient_safety_df, nutrition_df, ingredients_list
+    return ingredient_safety_df, nutrition_df, ingredients_list, lookups
 
 def clean_text(text: str) -> str:
     text = text.lower()
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-def match_ingredient(ingredient: str, ingredients_list: list, threshold=80):
-    ingr_clean = clean_text(ingredient)
-    best_match = None
-    highest_score = 0
-    for ref in ingredients_list:
-        ref_clean = clean_text(ref)
-        score = fuzz.ratio(ingr_clean, ref_clean)
-        if score > highest_score:
-            highest_score = score
-            best_match = ref
-    if highest_score >= threshold:
-        return best_match
-    for ref in ingredients_list:
-        ref_words = clean_text(ref).split()
-        for word in ingr_clean.split():
-            if word in ref_words:
-                return ref
+    if text.isascii():
+        # Table translate + split/join does both regex passes in C.
+        return " ".join(text.translate(_ASCII_CLEAN).split())
+    return _WS.sub(" ", _NON_ALNUM.sub(" ", text)).strip()
+
+def build_lookups(cleaned_refs: list) -> dict:
+    """
+    Keeps the cleaned reference names and builds a word -> first reference
+    index map so matching does not re-clean every reference per call.
+    """
+    word_index = {}
+    for idx, ref_clean in enumerate(cleaned_refs):
+        for word in ref_clean.split():
+            word_index.setdefault(word, idx)
+    return {"cleaned_refs": cleaned_refs, "word_index": word_index}
+
+def build_safety_map(ingredient_safety_df) -> dict:
+    """
+    Maps lowercased ingredient name -> (safety_status, reason_for_unsafety),
+    keeping the first row for duplicate names.
+    """
+    safety_map = {}
+    rows = zip(
+        ingredient_safety_df['ingredient_name'].str.lower(),
+        ingredient_safety_df['safety_status'],
+        ingredient_safety_df['reason_for_unsafety']
+    )
+    for name, status, reason in rows:
+        safety_map.setdefault(name, (status, reason))
+    return safety_map
+
+def build_nutrition_thresholds(nutrition_df) -> dict:
+    """Maps nutrient -> (low_threshold, high_threshold, note)."""
+    rows = zip(
+        nutrition_df['nutrient'],
+        nutrition_df['low_threshold'].astype(float),
+        nutrition_df['high_threshold'].astype(float),
+        nutrition_df['note']
+    )
+    return {nutrient: (low, high, note) for nutrient, low, high, note in rows}
+
+def _match_by_words(ingr_clean: str, ingredient: str, ingredients_list: list, word_index: dict):
+    hits = [word_index[word] for word in ingr_clean.split() if word in word_index]
+    if hits:
+        return ingredients_list[min(hits)]
     return ingredient
 
-def detect_ingredients(ingredients_input, ingredient_safety_df, ingredients_list):
+def match_ingredients(ingredients_input: list, ingredients_list: list, lookups: dict, threshold=80) -> list:
+    """
+    Matches each ingredient to its canonical name: scores every ingredient
+    against every reference in a single rapidfuzz cdist call, picks each
+    row's best match, and falls back to a word lookup below the threshold.
+    """
+    queries = [clean_text(ingr) for ingr in ingredients_input]
+    cleaned_refs = lookups["cleaned_refs"]
+    if queries and cleaned_refs:
+        scores = process.cdist(queries, cleaned_refs, scorer=fuzz.ratio, score_cutoff=threshold)
+        best_idx = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(queries)), best_idx]
+        matched_idx = np.where(best_score >= threshold, best_idx, -1)
+    else:
+        matched_idx = [-1] * len(queries)
+    word_index = lookups["word_index"]
+    return [
+        ingredients_list[idx] if idx >= 0 else _match_by_words(ingr_clean, ingr, ingredients_list, word_index)
+        for ingr, ingr_clean, idx in zip(ingredients_input, queries, matched_idx)
+    ]
+
+def detect_ingredients(ingredients_input, ingredients_list, lookups):
+    """
+    Returns the sorted ingredient analysis and the raw Model 3 status points
+    (summed in the same pass, so scoring does not walk the list again).
+    """
+    safety_map = lookups["safety_map"]
     results = []
-    for ingr in ingredients_input:
-        canonical_name = match_ingredient(ingr, ingredients_list)
-        safety_row = ingredient_safety_df[ingredient_safety_df['ingredient_name'].str.lower() == canonical_name.lower()]
-        if not safety_row.empty:
-            status = safety_row.iloc[0]['safety_status']
-            reason = safety_row.iloc[0]['reason_for_unsafety']
-        else:
-            status = "unknown"
-            reason = "No information available"
+    raw = 0
+    for canonical_name in match_ingredients(ingredients_input, ingredients_list, lookups):
+        status, reason = safety_map.get(canonical_name.lower(), ("unknown", "No information available"))
+        raw += model3.STATUS_POINTS.get(str(status).lower(), 0)
         results.append({
             "name": canonical_name,
             "status": status,
@@ -53,20 +164,18 @@ def detect_ingredients(ingredients_input, ingredient_safety_df, ingredients_list
         })
     order = {"unsafe": 0, "caution": 1, "safe": 2, "unknown": 3}
     results = sorted(results, key=lambda x: order.get(x['status'], 3))
-    return results
+    return results, raw
 
-def evaluate_nutrition(nutrition_input, nutrition_df):
+def evaluate_nutrition(nutrition_input, lookups):
+    thresholds = lookups["nutrition_thresh"]
     pros, cons = [], []
-    for _, row in nutrition_df.iterrows():
-        nutrient = row['nutrient']
-        if nutrient not in nutrition_input or pd.isna(nutrition_input[nutrient]):
+    for nutrient, value in nutrition_input.items():
+        threshold = thresholds.get(nutrient)
+        if threshold is None or pd.isna(value):
             continue
-        value = nutrition_input[nutrient]
         if isinstance(value, str):
-            value = float(re.findall(r"[\d\.]+", value)[0])
-        low = float(row['low_threshold'])
-        high = float(row['high_threshold'])
-        note = row['note']
+            value = float(_NUMBER.findall(value)[0])
+        low, high, note = threshold
         if value < low:
             cons.append(f"Low {nutrient} ({note})")
         elif value > high:
@@ -75,16 +184,21 @@ def evaluate_nutrition(nutrition_input, nutrition_df):
             pros.append(f"Balanced {nutrient}")
     return pros, cons
 
-def analyze_product(product_json, ingredient_safety_df, nutrition_df, ingredients_list):
+def analyze_product(product_json, ingredients_list, lookups):
     ingredients_input = product_json.get("ingredients", [])
     nutrition_input = product_json.get("nutrition", {})
     product_name = product_json.get("product_name", "Unnamed Product")
-    ingredient_analysis = detect_ingredients(ingredients_input, ingredient_safety_df, ingredients_list)
-    nutrition_pros, nutrition_cons = evaluate_nutrition(nutrition_input, nutrition_df)
+    ingredient_analysis, ingredient_raw = detect_ingredients(ingredients_input, ingredients_list, lookups)
+    nutrition_pros, nutrition_cons = evaluate_nutrition(nutrition_input, lookups)
     result = {
         "product_name": product_name,
         "ingredient_analysis": ingredient_analysis,
         "nutrition_pros": nutrition_pros,
-        "nutrition_cons": nutrition_cons
+        "nutrition_cons": nutrition_cons,
+        "ingredient_score": model3.ingredient_score_from_raw(ingredient_raw, len(ingredient_analysis)),
+        "nutrition_score": model3.nutrition_score_from_pros_cons(nutrition_pros, nutrition_cons)
     }
-    return result
\ No newline at end of file
+    return result
+
+if __name__ == "__main__":
+    build_cache()
\ No newline at end of file
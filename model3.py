@@ -8,21 +8,24 @@ Provides compute_safety_score(...) which combines:
 The function is defensive and works with varying shapes returned by model2.analyze_product.
 """
 from typing import List, Dict, Optional
+import numpy as np
 
-def _compute_ingredient_score(ingredient_analysis: List[Dict]) -> float:
+STATUS_POINTS = {'safe': 1, 'caution': 0, 'unsafe': -1, 'unknown': 0}
+
+# Per-nutrient divisor, cap and sign (penalty -1 / bonus +1) for the value-based nutrition score.
+_NUTRIENT_KEYS = ("sugar_g", "sodium_mg", "total_fat_g", "protein_g")
+_DIVS = np.array([10.0, 500.0, 10.0, 5.0])
+_CAPS = np.array([2.5, 2.0, 1.5, 2.0])
+_SIGNS = np.array([-1.0, -1.0, -1.0, 1.0])
+
+def ingredient_score_from_raw(raw: float, n: int) -> float:
     """
-    Convert ingredient statuses into a 0-10 score.
-    ingredient_analysis: list of {"name": ..., "status": "safe"|"caution"|"unsafe"|"unknown", ...}
+    Convert summed ingredient status points into a 0-10 score.
+    raw: sum of STATUS_POINTS over the n analysed ingredients
     """
-    if not ingredient_analysis:
+    if not n:
         return 5.0 
 
-    mapping = {'safe': 1, 'caution': 0, 'unsafe': -1, 'unknown': 0}
-    raw = 0
-    for ing in ingredient_analysis:
-        raw += mapping.get(str(ing.get("status", "")).lower(), 0)
-
-    n = len(ingredient_analysis)
     normalized = ((raw + n) / (2 * n)) * 10
     return round(normalized, 2)
 
@@ -34,23 +37,15 @@ def _compute_nutrition_score_from_values(nutrition_info: Dict[str, float]) -> fl
     """
     if not nutrition_info:
         return 5.0
-    sugar = float(nutrition_info.get("sugar_g", 0) or 0)
-    sodium = float(nutrition_info.get("sodium_mg", 0) or 0)
-    fat = float(nutrition_info.get("total_fat_g", 0) or 0)
-    protein = float(nutrition_info.get("protein_g", 0) or 0)
+    vals = np.array([float(nutrition_info.get(key, 0) or 0) for key in _NUTRIENT_KEYS]) / _DIVS
 
     base = 5.0
-    sugar_penalty = min(sugar / 10.0, 2.5)       
-    sodium_penalty = min(sodium / 500.0, 2.0)    
-    fat_penalty = min(fat / 10.0, 1.5)           
-    protein_bonus = min(protein / 5.0, 2.0)      
-
-    adj = -sugar_penalty - sodium_penalty - fat_penalty + protein_bonus
+    adj = float((np.minimum(vals, _CAPS) * _SIGNS).sum())
     score = max(0.0, min(10.0, base + adj))
     return round(score, 2)
 
 
-def _compute_nutrition_score_from_pros_cons(nutrition_pros: List[str], nutrition_cons: List[str]) -> float:
+def nutrition_score_from_pros_cons(nutrition_pros: List[str], nutrition_cons: List[str]) -> float:
     """
     If you only have pros/cons text lists (from model2), convert to score:
     - each 'pro' adds a small positive
@@ -82,15 +77,24 @@ def compute_safety_score(
     Returns:
     - final safety score (0.0 - 10.0)
     """
-    ingr_score = _compute_ingredient_score(ingredient_analysis)
+    raw = sum(STATUS_POINTS.get(str(ing.get("status", "")).lower(), 0) for ing in ingredient_analysis or [])
+    ingr_score = ingredient_score_from_raw(raw, len(ingredient_analysis or []))
 
     if nutrition_info:
         nutri_score = _compute_nutrition_score_from_values(nutrition_info)
     else:
         pros = nutrition_pros or []
         cons = nutrition_cons or []
-        nutri_score = _compute_nutrition_score_from_pros_cons(pros, cons)
+        nutri_score = nutrition_score_from_pros_cons(pros, cons)
 
+    return combine_scores(ingr_score, nutri_score, weight_ingredient, weight_nutrition)
+
+
+def combine_scores(ingr_score: float, nutri_score: float, weight_ingredient: float = 0.6, weight_nutrition: float = 0.4) -> float:
+    """
+    Weighted combination of an ingredient score and a nutrition score (both 0-10).
+    Weights are normalized to sum to 1.
+    """
     w_ing = float(weight_ingredient)
     w_nut = float(weight_nutrition)
     total_w = w_ing + w_nut if (w_ing + w_nut) != 0 else 1.0
@@ -104,8 +108,16 @@ def compute_safety_score(
 def compute_safety_score_from_model2_output(model2_output: Dict, weight_ingredient=0.6, weight_nutrition=0.4) -> float:
     """
     Accepts model2 output (dict returned by analyze_product) and extracts
-    required fields automatically.
+    required fields automatically. Uses the ingredient/nutrition scores
+    model2 already computed when present.
     """
+    if "ingredient_score" in model2_output and "nutrition_score" in model2_output:
+        return combine_scores(
+            model2_output["ingredient_score"],
+            model2_output["nutrition_score"],
+            weight_ingredient=weight_ingredient,
+            weight_nutrition=weight_nutrition
+        )
     ingredient_analysis = model2_output.get("ingredient_analysis", [])
     nutrition_info = model2_output.get("nutrition", None) or model2_output.get("nutrition_info", None) or None
     pros = model2_output.get("nutrition_pros", [])
@@ -5,9 +5,12 @@ Provides:
 - load_alternatives(): Loads the product lookup CSV.
 - suggest_alternative(): Checks safety score, then finds a specific 
                          alternative from the loaded data.
+- suggest_alternative_by_name(): The lookup alone, without the score check.
 """
 import pandas as pd
 
+SAFETY_THRESHOLD = 7.0
+
 def load_alternatives(csv_path="data\product_alternatives.csv"):
     try:
         df = pd.read_csv(csv_path)
@@ -26,41 +29,42 @@ def load_alternatives(csv_path="data\product_alternatives.csv"):
         df = pd.DataFrame(data)
     except Exception as e:
         print(f"Error loading {csv_path}: {e}")
-        return pd.DataFrame(columns=["Product", "Alternative Safe Product"])
+        return {}
     if "Product" not in df.columns or "Alternative Safe Product" not in df.columns:
         print("Error: The CSV must have 'Product' and 'Alternative Safe Product' columns.")
-        return pd.DataFrame(columns=["Product", "Alternative Safe Product"])
-    df['lookup_key'] = df['Product'].str.lower().str.replace(' ', '_')
+        return {}
+    lookup_keys = df['Product'].str.lower().str.replace(' ', '_')
+    alternatives = df['Alternative Safe Product'].astype(str)
 
-    df.set_index('lookup_key', inplace=True)
+    alt_map = {}
+    for key, alternative in zip(lookup_keys, alternatives):
+        alt_map.setdefault(key, alternative)
     
-    return df
+    return alt_map
 
-def suggest_alternative(product_name: str, safety_score: float, alternatives_df: pd.DataFrame) -> str | None:
+def suggest_alternative(product_name: str, safety_score: float, alternatives_map: dict) -> str | None:
     """
     Suggests an alternative for a given product name *only if* the
-    safety score is below the threshold (7.0).
+    safety score is below the threshold (SAFETY_THRESHOLD).
 
     Args:
         product_name: The name of the product (e.g., "Coca Cola").
         safety_score: The score from Model 3 (e.g., 3.5).
-        alternatives_df: The loaded DataFrame from load_alternatives().
+        alternatives_map: The lookup dict from load_alternatives().
 
     Returns:
         The alternative product string, or None if not needed or not found.
     """
-    if safety_score >= 7.0:
+    if safety_score >= SAFETY_THRESHOLD:
         return None
-    if alternatives_df is None or alternatives_df.empty:
+    return suggest_alternative_by_name(product_name, alternatives_map)
+
+def suggest_alternative_by_name(product_name: str, alternatives_map: dict) -> str | None:
+    """
+    Looks up the alternative for a product regardless of its safety score.
+    """
+    if not alternatives_map:
         return None
     lookup_key = product_name.lower().replace(' ', '_')
     
-    try:
-        alternative = alternatives_df.loc[lookup_key, 'Alternative Safe Product']
-        return str(alternative)
-    except KeyError:
-        return None
-    except Exception as e:
-        print(f"Error during lookup for '{lookup_key}': {e}")
-        return None
-
+    return alternatives_map.get(lookup_key)